@@ -4,15 +4,112 @@ RESEARCH ASSISTANT V2
 Calcula momentum, stage analysis y risk profiling para insider opportunities
 """
 import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
+import re
+import random
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
+from cache import FileCache
+
+# orjson es opcional: serializador JSON en C (fallback a json stdlib)
+try:
+    import orjson
+    _orjson_available = True
+except ImportError:
+    _orjson_available = False
+
+# pyarrow es opcional: parser de CSV multihilo (fallback al engine C de pandas)
+try:
+    import pyarrow  # noqa: F401
+    _pyarrow_available = True
+except ImportError:
+    _pyarrow_available = False
+
+# Esquema de los CSV generados por scraper.py (evita inferencia de tipos al leer)
+# Enteros nullable: una celda vacía queda como NA en vez de romper la lectura
+CLUSTER_DTYPES = {
+    'type': str, 'ticker': str, 'score': 'Int64', 'insider_count': 'Int32',
+    'total_value_usd': 'Int64', 'total_value_millions': 'float64',
+    'avg_purchase_value': 'Int64', 'avg_purchase_price': 'float64',
+    'latest_purchase': str, 'days_since_latest': 'Int32', 'freshness': str,
+    'insiders_detail': str
+}
+
+WHALE_DTYPES = {
+    'type': str, 'ticker': str, 'company_name': str, 'insider_name': str, 'title': str,
+    'purchase_value_usd': 'Int64', 'purchase_value_millions': 'float64',
+    'purchase_price': 'float64', 'purchase_date': str, 'days_since_trade': 'Int32',
+    'freshness': str, 'confidence': str, 'whale_score': 'Int64', 'qty_purchased': 'Int64'
+}
+
+# Columnas exclusivas de cada tipo (al concatenar quedan NaN en el otro tipo)
+CLUSTER_ONLY_COLUMNS = set(CLUSTER_DTYPES) - set(WHALE_DTYPES)
+WHALE_ONLY_COLUMNS = set(WHALE_DTYPES) - set(CLUSTER_DTYPES)
+
+# Señales de cluster precalculadas: índice = pe_code*9 + range_code*3 + cap_code
+_PE_SIGNALS = ("Low PE", "", "High PE")                  # <15 | 15-30 / sin PE | >30
+_RANGE_SIGNALS = ("Deep Discount", "", "Near Highs")     # <-30% | -30..-10% | >-10% vs 52W high
+_CAP_SIGNALS = ("Small Cap", "Mid Cap", "Large Cap")     # <=2B | <=50B | >50B
+SIGNAL_STRINGS = np.array(
+    [' | '.join(filter(None, combo)) for combo in itertools.product(_PE_SIGNALS, _RANGE_SIGNALS, _CAP_SIGNALS)],
+    dtype=object
+)
+
+# Columnas que solo van al CSV, no a los buckets del JSON (research_signals sí va: lo muestra el dashboard)
+REPORT_EXCLUDED_COLUMNS = ('52w_high', '52w_low', 'pct_from_52w_high', 'pct_from_52w_low', 'analysis_date')
+
+# Columnas que agrega analyze_opportunities, en el orden del reporte (tras las del primer tipo)
+ENRICHED_COLUMNS = ['current_price', 'insider_price', 'momentum_pct', 'stage', 'stage_desc', 'risk_level',
+                    'strategy', 'day_change_pct', 'market_cap_millions', 'pe_ratio', 'industry',
+                    '52w_high', '52w_low', 'pct_from_52w_high', 'pct_from_52w_low',
+                    'research_signals', 'analysis_date']
+
+# Stages de momentum indexados por stage_code = (m >= 0) + (m > early_max) + (m > confirmed_max)
+STAGES = np.array(['early_negative', 'early_positive', 'confirmed', 'late'], dtype=object)
+STAGE_DESCS = np.array(['Early Negative', 'Early Positive', 'Confirmed', 'Late Momentum'], dtype=object)
+STAGE_RISKS = np.array(['high', 'medium', 'medium-low', 'high'], dtype=object)
+
+# Clasificación de title para whale signals (compilado una sola vez)
+_CEO_TITLE_RE = re.compile(r'ceo|chief executive', re.IGNORECASE)
+_FOUNDER_TITLE_RE = re.compile(r'founder', re.IGNORECASE)
+_MAJOR_HOLDER_TITLE_RE = re.compile(r'10%')
+
+class TokenBucket:
+    """Rate limiter thread-safe: repone `rate` permisos por segundo hasta `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un permiso disponible"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 class ResearchAssistant:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", ttl_quote=3600, ttl_profile=30*86400):
         self.data_dir = Path(data_dir)
         
         # Archivos de entrada y salida
@@ -21,9 +118,6 @@ class ResearchAssistant:
         self.research_report = self.data_dir / "weekly_research_report.json"
         self.research_csv = self.data_dir / "weekly_research_report.csv"
         
-        # API key
-        self.finnhub_key = self.load_api_key()
-        
         # Momentum stages configuration
         self.momentum_config = {
             'early_max': 5.0,      # 0-5%: Early stage
@@ -31,6 +125,41 @@ class ResearchAssistant:
             'late_min': 15.0       # 15%+: Late stage
         }
         
+        # Finnhub API: límite por minuto + ráfagas cortas
+        self.api_config = {
+            'calls_per_minute': 150,
+            'burst': 30,
+            'max_workers': 5,
+            'pool_maxsize': 16,
+            'max_retries_429': 3,
+            'max_retries_5xx': 3
+        }
+        
+        # Session compartida (keep-alive) + rate limiter para todos los workers
+        # 5xx y errores de conexión se reintentan en el adapter; 429 lo maneja _finnhub_get
+        self.session = requests.Session()
+        # respect_retry_after_header=False: si no, urllib3 también reintenta 429 con Retry-After
+        retry = Retry(total=self.api_config['max_retries_5xx'], backoff_factor=0.5,
+                      status_forcelist=[500, 502, 503, 504], allowed_methods=['GET'],
+                      respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.api_config['pool_maxsize'],
+                              pool_maxsize=self.api_config['pool_maxsize'],
+                              max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = TokenBucket(self.api_config['calls_per_minute'] / 60,
+                                        self.api_config['burst'])
+        
+        # Cache en disco: profiles casi estáticos, quotes reutilizables intra-hora
+        self.cache = FileCache(self.data_dir / ".cache")
+        self.ttl_quote = ttl_quote
+        self.ttl_profile = ttl_profile
+        self._profile_cache = {}  # profiles ya obtenidos en este proceso, por ticker
+        
+    @cached_property
+    def finnhub_key(self):
+        """API key de Finnhub, resuelta una sola vez y solo si se usa"""
+        return self.load_api_key()
+    
     def load_api_key(self):
         """Carga API key desde archivo o environment variable"""
         import os
@@ -46,48 +175,72 @@ class ResearchAssistant:
         print("[WARN] No API key found - usando hardcoded")
         return "d28176pr01qr2iau5o4gd28176pr01qr2iau5o50"
     
+    def _read_opportunities_csv(self, path, dtypes):
+        """Lee un CSV de opportunities con columnas y tipos explícitos (columnas faltantes -> vacías)"""
+        engine = 'pyarrow' if _pyarrow_available else 'c'
+        # Texto como 'string': con dtype=str el engine pyarrow convierte las celdas vacías en 'None'
+        read_dtypes = {col: 'string' if dtype is str else dtype for col, dtype in dtypes.items()}
+        df = pd.read_csv(path, dtype=read_dtypes, engine=engine).reindex(columns=list(dtypes))
+        
+        # Texto vacío -> NaN (como el engine C con dtype=str); columnas faltantes con su tipo
+        text = [col for col, dtype in dtypes.items() if dtype is str]
+        df[text] = df[text].astype(object).where(df[text].notna(), np.nan)
+        return df.astype({col: dtype for col, dtype in dtypes.items() if dtype is not str})
+    
     def load_opportunities(self):
-        """Carga clusters y whales"""
-        cluster_data = []
-        whale_data = []
+        """Carga clusters y whales como DataFrames"""
+        cluster_df = pd.DataFrame(columns=list(CLUSTER_DTYPES))
+        whale_df = pd.DataFrame(columns=list(WHALE_DTYPES))
         
         # Cargar clusters
         if self.opportunities_file.exists():
-            cluster_df = pd.read_csv(self.opportunities_file)
-            cluster_data = cluster_df.to_dict('records')
-            print(f" Cargadas {len(cluster_data)} cluster opportunities")
+            cluster_df = self._read_opportunities_csv(self.opportunities_file, CLUSTER_DTYPES)
+            print(f" Cargadas {len(cluster_df)} cluster opportunities")
         
         # Cargar whales  
         if self.whale_file.exists():
-            whale_df = pd.read_csv(self.whale_file)
-            whale_data = whale_df.to_dict('records')
-            print(f" Cargadas {len(whale_data)} whale opportunities")
+            whale_df = self._read_opportunities_csv(self.whale_file, WHALE_DTYPES)
+            print(f" Cargadas {len(whale_df)} whale opportunities")
         
-        if not cluster_data and not whale_data:
+        if cluster_df.empty and whale_df.empty:
             print(f" No se encontraron datos")
             print(f" Ejecuta primero: python scraper.py")
             return None, None
         
-        return cluster_data, whale_data
+        return cluster_df, whale_df
     
-    def enrich_with_market_data(self, all_opportunities):
+    def enrich_with_market_data(self, all_opportunities, force_refresh=False):
         """Enriquece con datos de mercado actuales"""
         print(f" Obteniendo precios actuales via Finnhub...")
         
-        # Obtener tickers únicos
-        tickers = list(set(opp['ticker'] for opp in all_opportunities))
+        # Obtener tickers únicos en orden de aparición (acepta DataFrame o list de dicts)
+        if isinstance(all_opportunities, pd.DataFrame):
+            tickers = all_opportunities['ticker'].unique().tolist()
+        else:
+            tickers = list(dict.fromkeys(opp['ticker'] for opp in all_opportunities))
         print(f" Actualizando {len(tickers)} tickers: {', '.join(tickers[:10])}{'...' if len(tickers) > 10 else ''}")
         
         market_data = {}
         successful_updates = 0
         
+        # Profiles casi estáticos: solo se piden a la API los que no están en cache
+        profiles = {} if force_refresh else self.load_cached_profiles(tickers)
+        missing_profiles = [ticker for ticker in tickers if ticker not in profiles]
+        print(f" Profiles en cache: {len(profiles)}/{len(tickers)}")
+        
+        # Quotes + profiles faltantes en paralelo (limitado por rate_limiter)
+        api_key = self.finnhub_key  # resuelta aquí, una vez, antes de repartir trabajo a los workers
+        with ThreadPoolExecutor(max_workers=self.api_config['max_workers']) as executor:
+            quote_futures = self.fetch_quotes(executor, tickers, api_key, force_refresh)
+            profile_futures = self.fetch_profiles(executor, missing_profiles, api_key)
+        
         for ticker in tickers:
             try:
                 # Obtener quote actual
-                quote_data = self.get_stock_quote(ticker)
+                quote_data = quote_futures[ticker].result()
                 
                 # Obtener info básica de la empresa
-                profile_data = self.get_company_profile(ticker)
+                profile_data = profiles[ticker] if ticker in profiles else profile_futures[ticker].result()
                 
                 if quote_data and profile_data:
                     market_data[ticker] = {
@@ -108,80 +261,72 @@ class ResearchAssistant:
                 else:
                     print(f"️  {ticker}: No data available")
                 
-                time.sleep(1.2)  # Rate limiting
-                
             except Exception as e:
                 print(f" Error con {ticker}: {e}")
         
         print(f" Actualizados: {successful_updates}/{len(tickers)} tickers")
         return market_data
     
-    def get_stock_quote(self, ticker):
-        """Obtiene quote actual"""
-        url = f"https://finnhub.io/api/v1/quote?symbol={ticker}&token={self.finnhub_key}"
-        response = requests.get(url, timeout=10)
-        return response.json() if response.status_code == 200 else None
+    def load_cached_profiles(self, tickers):
+        """Profiles vigentes en memoria o en el cache de disco, por ticker"""
+        profiles = {}
+        for ticker in tickers:
+            cached = self._profile_cache.get(ticker) or self.cache.get('profile2', ticker, self.ttl_profile)
+            if cached is not None:
+                profiles[ticker] = self._profile_cache[ticker] = cached
+        return profiles
     
-    def get_company_profile(self, ticker):
-        """Obtiene perfil de empresa"""
-        url = f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker}&token={self.finnhub_key}"
-        response = requests.get(url, timeout=10)
-        return response.json() if response.status_code == 200 else None
+    def fetch_quotes(self, executor, tickers, api_key, force_refresh=False):
+        """Envía los quotes al pool; retorna {ticker: future}"""
+        return {ticker: executor.submit(self.get_stock_quote, ticker, force_refresh, api_key) for ticker in tickers}
     
-    def calculate_momentum_and_stage(self, opportunity, market_data):
-        """Calcula momentum y determina stage"""
-        ticker = opportunity['ticker']
-        
-        if ticker not in market_data:
-            return None
-        
-        current_price = market_data[ticker]['current_price']
-        if current_price <= 0:
-            return None
-        
-        # Obtener precio de compra insider
-        if opportunity['type'] == 'whale':
-            insider_price = opportunity['purchase_price']
-        else:  # cluster
-            insider_price = opportunity['avg_purchase_price']
-        
-        if insider_price <= 0:
-            return None
-        
-        # Calcular momentum
-        momentum_pct = ((current_price - insider_price) / insider_price) * 100
+    def fetch_profiles(self, executor, tickers, api_key):
+        """Envía al pool profiles que ya se sabe que no están en cache; retorna {ticker: future}"""
+        # force_refresh=True: el cache ya se consultó en load_cached_profiles
+        return {ticker: executor.submit(self.get_company_profile, ticker, True, api_key) for ticker in tickers}
+    
+    def _finnhub_get(self, url):
+        """GET a Finnhub respetando el rate limit compartido; backoff solo ante HTTP 429"""
+        for attempt in range(self.api_config['max_retries_429'] + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, timeout=10)
+            if response.status_code != 429:
+                break
+            
+            # Rate limited: esperar Retry-After (o backoff exponencial) + jitter
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            time.sleep(delay + random.random())
         
-        # Determinar stage
-        if momentum_pct <= self.momentum_config['early_max']:
-            if momentum_pct >= 0:
-                stage = 'early_positive'
-                stage_desc = 'Early Positive'
-                risk_level = 'medium'
-            else:
-                stage = 'early_negative'  
-                stage_desc = 'Early Negative'
-                risk_level = 'high'
-        elif momentum_pct <= self.momentum_config['confirmed_max']:
-            stage = 'confirmed'
-            stage_desc = 'Confirmed'
-            risk_level = 'medium-low'
-        else:
-            stage = 'late'
-            stage_desc = 'Late Momentum'
-            risk_level = 'high'
-        
-        # Strategy recommendation
-        strategy = self.get_strategy_recommendation(stage, momentum_pct, opportunity)
-        
-        return {
-            'current_price': round(current_price, 2),
-            'insider_price': round(insider_price, 2),
-            'momentum_pct': round(momentum_pct, 2),
-            'stage': stage,
-            'stage_desc': stage_desc,
-            'risk_level': risk_level,
-            'strategy': strategy
-        }
+        return response.json() if response.status_code == 200 else None
+    
+    def _cached_finnhub_get(self, endpoint, ticker, url, ttl, force_refresh=False):
+        """GET a Finnhub pasando primero por el cache en disco"""
+        if not force_refresh:
+            cached = self.cache.get(endpoint, ticker, ttl)
+            if cached is not None:
+                return cached
+        
+        payload = self._finnhub_get(url)
+        if payload:
+            self.cache.set(endpoint, ticker, payload)
+        return payload
+    
+    def get_stock_quote(self, ticker, force_refresh=False, api_key=None):
+        """Obtiene quote actual"""
+        url = f"https://finnhub.io/api/v1/quote?symbol={ticker}&token={api_key or self.finnhub_key}"
+        return self._cached_finnhub_get('quote', ticker, url, self.ttl_quote, force_refresh)
+    
+    def get_company_profile(self, ticker, force_refresh=False, api_key=None):
+        """Obtiene perfil de empresa (memoizado en memoria durante el proceso)"""
+        if not force_refresh and ticker in self._profile_cache:
+            return self._profile_cache[ticker]
+        
+        url = f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker}&token={api_key or self.finnhub_key}"
+        profile = self._cached_finnhub_get('profile2', ticker, url, self.ttl_profile, force_refresh)
+        if profile:
+            self._profile_cache[ticker] = profile
+        return profile
     
     def get_strategy_recommendation(self, stage, momentum_pct, opportunity):
         """Genera recomendación de strategy basada en stage"""
@@ -230,234 +375,225 @@ class ResearchAssistant:
             }
     
     def analyze_opportunities(self, cluster_data, whale_data, market_data):
-        """Analiza todas las opportunities con momentum"""
+        """Analiza todas las opportunities con momentum (una sola pasada vectorizada)"""
         print(f" Analizando momentum y stages...")
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        # Unificar clusters y whales con su precio de compra insider
+        frames = []
+        for data, opp_type, price_col in ((cluster_data, 'cluster', 'avg_purchase_price'),
+                                          (whale_data, 'whale', 'purchase_price')):
+            frame = pd.DataFrame(data)
+            if not frame.empty:
+                frames.append(frame.assign(type=opp_type, insider_price=frame[price_col]))
+        
+        if not frames or not market_data:
+            return pd.DataFrame()
+        
+        # Agregar datos de mercado (left join por ticker)
+        market_df = pd.DataFrame.from_dict(market_data, orient='index').rename_axis('ticker').reset_index()
+        market_df = market_df[['ticker', 'current_price', 'day_change_percent', 'market_cap', 'pe_ratio',
+                               'industry', '52w_high', '52w_low']].rename(columns={
+            'day_change_percent': 'day_change_pct',
+            'market_cap': 'market_cap_millions'
+        })
+        df = pd.concat(frames, ignore_index=True).merge(market_df, on='ticker', how='left')
+        
+        # Solo opportunities con precio actual e insider válidos
+        df = df[(df['current_price'] > 0) & (df['insider_price'] > 0)].reset_index(drop=True)
+        
+        # Momentum y stage
+        momentum = (df['current_price'] - df['insider_price']) / df['insider_price'] * 100
+        stage_code = ((momentum >= 0).astype(int)
+                      + (momentum > self.momentum_config['early_max'])
+                      + (momentum > self.momentum_config['confirmed_max'])).to_numpy()
+        df['stage'] = STAGES[stage_code]
+        df['stage_desc'] = STAGE_DESCS[stage_code]
+        df['risk_level'] = STAGE_RISKS[stage_code]
+        df['strategy'] = [self.get_strategy_recommendation(stage, momentum_pct, {'type': opp_type})
+                          for stage, momentum_pct, opp_type in zip(df['stage'], momentum, df['type'])]
+        
+        # Distancia desde 52W highs/lows sobre el precio ya redondeado (0 si no hay rango)
+        df['current_price'] = current_price = df['current_price'].round(2)
+        high, low = df['52w_high'], df['52w_low']
+        df['momentum_pct'] = momentum
+        df['pct_from_52w_high'] = np.where(high > 0, (current_price - high) / high.where(high > 0) * 100, 0)
+        df['pct_from_52w_low'] = np.where(low > 0, (current_price - low) / low.where(low > 0) * 100, 0)
+        df['pe_ratio'] = df['pe_ratio'].where(df['pe_ratio'].fillna(0) != 0)
+        
+        df = df.round({
+            'insider_price': 2, 'momentum_pct': 2, 'day_change_pct': 2, 'market_cap_millions': 0,
+            'pe_ratio': 1, 'pct_from_52w_high': 1, 'pct_from_52w_low': 1
+        })
+        
+        # Research signals por tipo
+        is_cluster = df['type'] == 'cluster'
+        df['research_signals'] = ''
+        if is_cluster.any():
+            df.loc[is_cluster, 'research_signals'] = self.generate_research_signals(df[is_cluster])
+        if (~is_cluster).any():
+            df.loc[~is_cluster, 'research_signals'] = self.generate_whale_signals(df[~is_cluster])
+        df['analysis_date'] = today
+        
+        # Orden de columnas para Excel: primer tipo, enriquecimiento, exclusivas del otro tipo
+        first = [col for col in frames[0].columns if col != 'insider_price']
+        others = [col for frame in frames[1:] for col in frame.columns]
+        return df[list(dict.fromkeys(first + ENRICHED_COLUMNS + others))]
+    
+    @staticmethod
+    def to_records(df):
+        """DataFrame -> list de dicts; cada fila conserva solo las columnas y tipos de su tipo"""
+        if df.empty:
+            return []
+        records = {}
+        for opp_type, dtypes, foreign in (('cluster', CLUSTER_DTYPES, WHALE_ONLY_COLUMNS),
+                                          ('whale', WHALE_DTYPES, CLUSTER_ONLY_COLUMNS)):
+            part = df[df['type'] == opp_type].drop(columns=list(foreign), errors='ignore')
+            # El concat de clusters + whales deja en float64 los enteros exclusivos de cada tipo
+            part = part.astype({col: dtype for col, dtype in dtypes.items()
+                                if col in part.columns and dtype != str})
+            # NaN (p.ej. pe_ratio sin dato) -> None: json stdlib no emite NaN inválido y el dato queda falsy
+            part = part.astype(object).where(part.notna(), None)
+            records.update(zip(part.index, part.to_dict('records')))
+        return [records[i] for i in df.index]
+    
+    @staticmethod
+    def _join_signals(index, parts):
+        """Une arrays de señales con ' | ' omitiendo las vacías"""
+        signals = pd.Series(parts[0], index=index, dtype=object)
+        for part in parts[1:]:
+            part = pd.Series(part, index=index, dtype=object)
+            signals = signals + np.where(part != '', ' | ' + part, '')
+        return signals
+    
+    def generate_research_signals(self, df):
+        """Genera señales específicas para clusters (vectorizado sobre el DataFrame)"""
+        # Momentum signal
+        momentum = df['momentum_pct']
+        momentum_signal = np.select(
+            [momentum >= 10, momentum >= 5, momentum >= 0],
+            ["Strong Momentum", "Positive Momentum", "Early Positive"],
+            default="Insiders Down"
+        )
         
-        all_enriched = []
-        
-        # Procesar clusters
-        for opp in cluster_data:
-            momentum_data = self.calculate_momentum_and_stage(opp, market_data)
-            
-            if momentum_data:
-                enriched = opp.copy()
-                enriched.update(momentum_data)
-                
-                # Agregar datos de mercado
-                ticker = opp['ticker']
-                if ticker in market_data:
-                    market = market_data[ticker]
-                    enriched.update({
-                        'day_change_pct': round(market['day_change_percent'], 2),
-                        'market_cap_millions': round(market['market_cap'], 0),
-                        'pe_ratio': round(market['pe_ratio'], 1) if market['pe_ratio'] else None,
-                        'industry': market['industry'],
-                        '52w_high': market['52w_high'],
-                        '52w_low': market['52w_low']
-                    })
-                    
-                    # Calcular distancia desde 52W highs/lows
-                    current_price = momentum_data['current_price']
-                    if market['52w_high'] > 0:
-                        pct_from_high = ((current_price - market['52w_high']) / market['52w_high']) * 100
-                    else:
-                        pct_from_high = 0
-                    
-                    if market['52w_low'] > 0:
-                        pct_from_low = ((current_price - market['52w_low']) / market['52w_low']) * 100
-                    else:
-                        pct_from_low = 0
-                    
-                    enriched.update({
-                        'pct_from_52w_high': round(pct_from_high, 1),
-                        'pct_from_52w_low': round(pct_from_low, 1)
-                    })
-                
-                # Research signals específicos
-                signals = self.generate_research_signals(enriched)
-                enriched['research_signals'] = signals
-                enriched['analysis_date'] = datetime.now().strftime('%Y-%m-%d')
-                
-                all_enriched.append(enriched)
+        # Valuation, posición vs 52W range y market cap -> un código por fila
+        pe = df['pe_ratio']
+        pe_code = np.where(pe.isna(), 1, (pe >= 15).astype(int) + (pe > 30))
         
-        # Procesar whales  
-        for opp in whale_data:
-            momentum_data = self.calculate_momentum_and_stage(opp, market_data)
-            
-            if momentum_data:
-                enriched = opp.copy()
-                enriched.update(momentum_data)
-                
-                # Agregar datos de mercado
-                ticker = opp['ticker']
-                if ticker in market_data:
-                    market = market_data[ticker]
-                    enriched.update({
-                        'day_change_pct': round(market['day_change_percent'], 2),
-                        'market_cap_millions': round(market['market_cap'], 0),
-                        'pe_ratio': round(market['pe_ratio'], 1) if market['pe_ratio'] else None,
-                        'industry': market['industry'],
-                        '52w_high': market['52w_high'],
-                        '52w_low': market['52w_low']
-                    })
-                    
-                    # Calcular distancia desde 52W highs/lows
-                    current_price = momentum_data['current_price']
-                    if market['52w_high'] > 0:
-                        pct_from_high = ((current_price - market['52w_high']) / market['52w_high']) * 100
-                    else:
-                        pct_from_high = 0
-                    
-                    if market['52w_low'] > 0:
-                        pct_from_low = ((current_price - market['52w_low']) / market['52w_low']) * 100
-                    else:
-                        pct_from_low = 0
-                    
-                    enriched.update({
-                        'pct_from_52w_high': round(pct_from_high, 1),
-                        'pct_from_52w_low': round(pct_from_low, 1)
-                    })
-                
-                # Research signals para whales
-                signals = self.generate_whale_signals(enriched)
-                enriched['research_signals'] = signals
-                enriched['analysis_date'] = datetime.now().strftime('%Y-%m-%d')
-                
-                all_enriched.append(enriched)
+        pct_from_high = df['pct_from_52w_high'].fillna(0)
+        range_code = (pct_from_high >= -30).astype(int) + (pct_from_high > -10)
         
-        return all_enriched
-    
-    def generate_research_signals(self, opp):
-        """Genera señales específicas para clusters"""
-        signals = []
+        market_cap = df['market_cap_millions'].fillna(0)
+        cap_code = (market_cap > 2000).astype(int) + (market_cap > 50000)
         
-        # Momentum signal
-        momentum = opp['momentum_pct']
-        if momentum >= 10:
-            signals.append("Strong Momentum")
-        elif momentum >= 5:
-            signals.append("Positive Momentum")
-        elif momentum >= 0:
-            signals.append("Early Positive")
-        else:
-            signals.append("Insiders Down")
-        
-        # Valuation check
-        pe = opp.get('pe_ratio')
-        if pe and pe < 15:
-            signals.append("Low PE")
-        elif pe and pe > 30:
-            signals.append("High PE")
-        
-        # Position vs 52W range
-        pct_from_high = opp.get('pct_from_52w_high', 0)
-        if pct_from_high > -10:
-            signals.append("Near Highs")
-        elif pct_from_high < -30:
-            signals.append("Deep Discount")
-        
-        # Market cap category
-        market_cap = opp.get('market_cap_millions', 0)
-        if market_cap > 50000:
-            signals.append("Large Cap")
-        elif market_cap > 2000:
-            signals.append("Mid Cap")
-        else:
-            signals.append("Small Cap")
+        profile_signal = SIGNAL_STRINGS[pe_code * 9 + range_code.to_numpy() * 3 + cap_code.to_numpy()]
         
         # Freshness
-        freshness = opp.get('freshness', 'unknown')
-        if freshness == 'fresh':
-            signals.append("Fresh Buys")
-        elif freshness == 'recent':
-            signals.append("Recent Buys")
+        freshness = df['freshness'] if 'freshness' in df else pd.Series('unknown', index=df.index)
+        freshness_signal = np.select([freshness == 'fresh', freshness == 'recent'], ["Fresh Buys", "Recent Buys"], default='')
         
-        return ' | '.join(signals)
+        return self._join_signals(df.index, [momentum_signal, profile_signal, freshness_signal])
     
-    def generate_whale_signals(self, opp):
-        """Genera señales específicas para whales"""
-        signals = ["WHALE TRADE"]
-        
-        # Momentum signal  
-        momentum = opp['momentum_pct']
-        if momentum >= 15:
-            signals.append("Whale Winning Big")
-        elif momentum >= 5:
-            signals.append("Whale Winning")
-        elif momentum >= 0:
-            signals.append("Whale Even")
-        else:
-            signals.append("Whale Down")
+    def generate_whale_signals(self, df):
+        """Genera señales específicas para whales (vectorizado sobre el DataFrame)"""
+        # Momentum signal
+        momentum = df['momentum_pct']
+        momentum_signal = np.select(
+            [momentum >= 15, momentum >= 5, momentum >= 0],
+            ["Whale Winning Big", "Whale Winning", "Whale Even"],
+            default="Whale Down"
+        )
         
         # Size category
-        value_millions = opp.get('purchase_value_millions', 0)
-        if value_millions >= 500:
-            signals.append("Mega Whale (500M+)")
-        elif value_millions >= 200:
-            signals.append("Large Whale (200M+)")
-        else:
-            signals.append("Standard Whale (99M+)")
+        value_millions = df['purchase_value_millions'].fillna(0)
+        size_signal = np.select(
+            [value_millions >= 500, value_millions >= 200],
+            ["Mega Whale (500M+)", "Large Whale (200M+)"],
+            default="Standard Whale (99M+)"
+        )
         
         # Insider type
-        title = opp.get('title', '').lower()
-        if 'ceo' in title or 'chief executive' in title:
-            signals.append("CEO Trade")
-        elif 'founder' in title:
-            signals.append("Founder Trade")
-        elif '10%' in title:
-            signals.append("Major Shareholder")
-        
-        return ' | '.join(signals)
+        title = df['title'].fillna('')
+        title_signal = np.select(
+            [title.str.contains(_CEO_TITLE_RE),
+             title.str.contains(_FOUNDER_TITLE_RE),
+             title.str.contains(_MAJOR_HOLDER_TITLE_RE)],
+            ["CEO Trade", "Founder Trade", "Major Shareholder"],
+            default=''
+        )
+        
+        return self._join_signals(df.index, ["WHALE TRADE", momentum_signal, size_signal, title_signal])
     
     def generate_research_report(self, enriched_opportunities):
         """Genera reporte final con stage analysis"""
         print(f" Generando reporte con momentum analysis...")
         
-        # Separar por tipo y stage
-        early_opportunities = [opp for opp in enriched_opportunities if opp['stage'] in ['early_positive', 'early_negative']]
-        confirmed_opportunities = [opp for opp in enriched_opportunities if opp['stage'] == 'confirmed']
-        late_opportunities = [opp for opp in enriched_opportunities if opp['stage'] == 'late']
-        whale_opportunities = [opp for opp in enriched_opportunities if opp['type'] == 'whale']
-        cluster_opportunities = [opp for opp in enriched_opportunities if opp['type'] == 'cluster']
+        if isinstance(enriched_opportunities, pd.DataFrame):
+            df_research = enriched_opportunities
+        else:
+            df_research = pd.DataFrame(enriched_opportunities)
+        
+        stage = df_research.get('stage', pd.Series(dtype=object))
+        opp_type = df_research.get('type', pd.Series(dtype=object))
+        momentum = df_research.get('momentum_pct', pd.Series(dtype=float))
+        
+        # Conteos por stage y tipo en una sola pasada
+        stage_counts = stage.value_counts()
+        type_counts = opp_type.value_counts()
+        
+        # Score de research: score para clusters, whale_score para whales
+        scores = df_research.reindex(columns=['score', 'whale_score']).astype(float).fillna(0)
+        target_score = pd.Series(np.where(opp_type == 'cluster', scores['score'], scores['whale_score']),
+                                 index=df_research.index)
         
-        # Ordenar por momentum
-        early_opportunities.sort(key=lambda x: x['momentum_pct'], reverse=True)
-        confirmed_opportunities.sort(key=lambda x: x['momentum_pct'], reverse=True)
-        whale_opportunities.sort(key=lambda x: x['momentum_pct'], reverse=True)
+        report_columns = df_research.columns.difference(REPORT_EXCLUDED_COLUMNS, sort=False)
+        
+        def bucket(mask, n, sort_key=None):
+            """Top-n filas del mask como records (solo aquí se materializan dicts)"""
+            if df_research.empty:
+                return []
+            if sort_key is None:
+                rows = df_research[mask].head(n).index
+            else:
+                # nlargest(keep='first') = sorted(reverse=True) estable, en O(N) para n chico
+                rows = sort_key[mask].nlargest(n, keep='first').index
+            return self.to_records(df_research.loc[rows, report_columns])
         
         # Crear reporte estructurado
         report = {
             'generation_date': datetime.now().isoformat(),
             'summary': {
-                'total_opportunities': len(enriched_opportunities),
-                'whale_opportunities': len(whale_opportunities),
-                'cluster_opportunities': len(cluster_opportunities),
-                'early_stage': len(early_opportunities),
-                'confirmed_stage': len(confirmed_opportunities),
-                'late_stage': len(late_opportunities),
-                'avg_momentum': round(sum(opp['momentum_pct'] for opp in enriched_opportunities) / len(enriched_opportunities), 1) if enriched_opportunities else 0
+                'total_opportunities': len(df_research),
+                'whale_opportunities': int(type_counts.get('whale', 0)),
+                'cluster_opportunities': int(type_counts.get('cluster', 0)),
+                'early_stage': int(stage_counts.get('early_positive', 0) + stage_counts.get('early_negative', 0)),
+                'confirmed_stage': int(stage_counts.get('confirmed', 0)),
+                'late_stage': int(stage_counts.get('late', 0)),
+                'avg_momentum': round(float(df_research['momentum_pct'].mean()), 1) if not df_research.empty else 0
             },
             'stage_buckets': {
-                'early_opportunities': early_opportunities[:10],
-                'confirmed_opportunities': confirmed_opportunities[:10],
-                'late_opportunities': late_opportunities[:5]
+                'early_opportunities': bucket(stage.isin(['early_positive', 'early_negative']), 10, momentum),
+                'confirmed_opportunities': bucket(stage == 'confirmed', 10, momentum),
+                'late_opportunities': bucket(stage == 'late', 5)
             },
             'type_buckets': {
-                'whale_opportunities': whale_opportunities[:5],
-                'top_cluster_opportunities': cluster_opportunities[:10]
+                'whale_opportunities': bucket(opp_type == 'whale', 5, momentum),
+                'top_cluster_opportunities': bucket(opp_type == 'cluster', 10)
             },
-            'top_research_targets': sorted(enriched_opportunities, key=lambda x: x.get('score', 0) if x['type'] == 'cluster' else x.get('whale_score', 0), reverse=True)[:15]
+            'top_research_targets': bucket(pd.Series(True, index=df_research.index), 15, target_score)
         }
         
-        # Guardar JSON completo
-        with open(self.research_report, 'w') as f:
-            json.dump(report, f, indent=2)
-        
-        # Guardar CSV simple para Excel
-        df_research = pd.DataFrame(enriched_opportunities)
-        df_research.to_csv(self.research_csv, index=False)
+        # Guardar JSON completo (compacto, sin pretty-print)
+        if _orjson_available:
+            self.research_report.write_bytes(orjson.dumps(report, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(self.research_report, 'w') as f:
+                json.dump(report, f)
         
         print(f" Reporte guardado: {self.research_report}")
+        
+        # CSV simple para Excel
+        df_research.to_csv(self.research_csv, index=False)
         print(f" CSV research: {self.research_csv}")
         
         return report
@@ -493,37 +629,43 @@ class ResearchAssistant:
             print(f"   ${opp['avg_purchase_price']:.2f} → ${opp['current_price']:.2f} ({price_change:+.1f}%)")
             print(f"   Stage: {opp['stage_desc']} | Action: {opp['strategy']['action']}")
             print()
+    
+    def run(self):
+        """Pipeline completo: carga, enriquece, analiza y genera reporte"""
+        print(" RESEARCH ASSISTANT V2")
+        print("=" * 50)
+        
+        # 1. Cargar opportunities (clusters + whales)
+        cluster_data, whale_data = self.load_opportunities()
+        if cluster_data is None and whale_data is None:
+            return None
+        
+        # Combinar para market data fetch
+        all_opportunities = pd.concat([cluster_data[['ticker']], whale_data[['ticker']]], ignore_index=True)
+        
+        # 2. Enriquecer con datos de mercado
+        market_data = self.enrich_with_market_data(all_opportunities)
+        
+        # 3. Analizar momentum y stages
+        enriched_opportunities = self.analyze_opportunities(cluster_data, whale_data, market_data)
+        
+        # 4. Generar reporte
+        report = self.generate_research_report(enriched_opportunities)
+        
+        # 5. Mostrar resumen
+        self.print_research_summary(report)
+        
+        print(f"\n RESEARCH ASSISTANT V2 COMPLETADO")
+        print(f" Revisa: {self.research_csv}")
+        print(f" Próximo paso: Revisar stage buckets para strategy")
+        
+        return report
 
 def main():
     """Función principal"""
-    print(" RESEARCH ASSISTANT V2")
-    print("=" * 50)
-    
     assistant = ResearchAssistant()
-    
-    # 1. Cargar opportunities (clusters + whales)
-    cluster_data, whale_data = assistant.load_opportunities()
-    if cluster_data is None and whale_data is None:
+    if assistant.run() is None:
         sys.exit(1)
-    
-    # Combinar para market data fetch
-    all_opportunities = (cluster_data or []) + (whale_data or [])
-    
-    # 2. Enriquecer con datos de mercado
-    market_data = assistant.enrich_with_market_data(all_opportunities)
-    
-    # 3. Analizar momentum y stages
-    enriched_opportunities = assistant.analyze_opportunities(cluster_data or [], whale_data or [], market_data)
-    
-    # 4. Generar reporte
-    report = assistant.generate_research_report(enriched_opportunities)
-    
-    # 5. Mostrar resumen
-    assistant.print_research_summary(report)
-    
-    print(f"\n RESEARCH ASSISTANT V2 COMPLETADO")
-    print(f" Revisa: {assistant.research_csv}")
-    print(f" Próximo paso: Revisar stage buckets para strategy")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
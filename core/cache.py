@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+FILE CACHE
+Cache persistente en disco (JSON) con TTL por entrada
+"""
+import json
+import hashlib
+import os
+import time
+from pathlib import Path
+
+
+class FileCache:
+    """Guarda payloads JSON en {root}/{endpoint}/{md5(key)}.json con timestamp"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, endpoint, key):
+        digest = hashlib.md5(str(key).encode('utf-8')).hexdigest()
+        return self.root / endpoint / f"{digest}.json"
+
+    def get(self, endpoint, key, ttl):
+        """Retorna el payload si existe y tiene menos de `ttl` segundos, si no None"""
+        path = self._path(endpoint, key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('timestamp', 0) >= ttl:
+            return None
+        return entry.get('payload')
+
+    def set(self, endpoint, key, payload):
+        """Escribe el payload de forma atómica (seguro entre threads)"""
+        path = self._path(endpoint, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.{time.monotonic_ns()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'timestamp': time.time(), 'payload': payload}, f)
+        os.replace(tmp_path, path)
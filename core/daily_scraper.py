@@ -299,7 +299,8 @@ class DailyScraper:
 
         # 5. Detectar ventas (sales)
         print("\n PASO 2: Detectando ventas de insiders...")
-        all_sales = self.scraper.detect_insider_sales(current_df)
+        masks = self.scraper.compute_masks(current_df)  # Compartidos por ventas, whales y clusters
+        all_sales = self.scraper.detect_insider_sales(current_df, masks)
 
         # Detectar ventas NUEVAS
         new_sales = []
@@ -313,11 +314,11 @@ class DailyScraper:
 
         # 6. Detectar whale trades
         print("\n PASO 3: Detectando whale trades...")
-        whale_opportunities = self.scraper.detect_whale_trades(current_df)
+        whale_opportunities = self.scraper.detect_whale_trades(current_df, masks)
 
         # 7. Detectar clusters
         print("\n PASO 4: Detectando cluster buying...")
-        df_filtered = self.scraper.apply_intelligent_filters(current_df)
+        df_filtered = self.scraper.apply_intelligent_filters(current_df, masks)
         clusters = self.scraper.detect_cluster_buying(df_filtered)
         cluster_opportunities = self.scraper.save_opportunities(clusters)
 
@@ -342,9 +343,10 @@ class DailyScraper:
         print("\n PASO 7: Enriqueciendo con datos de mercado...")
         all_opportunities = cluster_opportunities + whale_opportunities
         market_data = self.assistant.enrich_with_market_data(all_opportunities)
-        enriched_opportunities = self.assistant.analyze_opportunities(
+        enriched_df = self.assistant.analyze_opportunities(
             cluster_opportunities, whale_opportunities, market_data
         )
+        enriched_opportunities = self.assistant.to_records(enriched_df)
 
         # 11. Enriquecer con track records de insiders
         enriched_opportunities = self.enrich_with_track_records(enriched_opportunities)
@@ -4,19 +4,53 @@ INTELLIGENT INSIDER SCRAPER V2
 Detecta patrones de acumulación + whale trades con análisis de momentum
 """
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
+import numpy as np
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import re
-from collections import defaultdict
 import sys
 
+from cache import FileCache
+
+# Símbolos a remover antes de parsear números/porcentajes de OpenInsider
+_NUM_RE = re.compile(r'[\$\,\s]')
+_PCT_RE = re.compile(r'[\%\,\s]')
+_PLUS_SIGN_RE = re.compile(r'^\+')
+
+
+def _py_round(series, ndigits):
+    """round() de Python por valor, para montos en millones (empates reales: $150,000 -> 0.15)
+
+    Series.round escala por 10**n y redondea en numpy: 0.15 -> 0.2, mientras que round()
+    da 0.1 como siempre mostraron los CSV y alertas. Precios y promedios usan Series.round.
+    """
+    return series.map(lambda value: round(value, ndigits))
+
+
 class IntelligentInsiderScraper:
-    def __init__(self, output_dir="data"):
+    # Primeras 13 columnas de la tabla 'tinytable' de OpenInsider (el resto se ignora)
+    RAW_COLUMNS = [
+        'x', 'filing_date', 'trade_date', 'ticker', 'company_name', 'insider_name', 'title',
+        'transaction_type', 'price', 'qty', 'shares_owned', 'ownership_change', 'transaction_value'
+    ]
+    RAW_CONVERTERS = {i: str for i in range(len(RAW_COLUMNS))}
+    # Columnas del DataFrame de clusters que retorna detect_cluster_buying
+    CLUSTER_COLUMNS = [
+        'type', 'ticker', 'insider_count', 'total_value', 'avg_value', 'avg_purchase_price',
+        'latest_purchase', 'days_since_latest', 'freshness', 'score', 'insiders_detail'
+    ]
+    
+    def __init__(self, output_dir="data", ttl_html=3600):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
+        # Cache en disco del HTML del screener: re-ejecuciones dentro de la hora no re-descargan
+        self.cache = FileCache(self.output_dir / ".cache")
+        self.ttl_html = ttl_html
+        
         # Ubicaciones fijas
         self.raw_csv = self.output_dir / "insider_trades_raw.csv"
         self.filtered_csv = self.output_dir / "insider_opportunities.csv"
@@ -34,6 +68,8 @@ class IntelligentInsiderScraper:
             'min_market_cap': 500000000,   # $500M mínimo
             'max_market_cap': 50000000000, # $50B máximo
             'min_daily_volume': 100000,    # 100K shares liquidity
+            'min_cluster_score': 50,       # Score mínimo para guardar un cluster
+            'max_pages': 1,                # Páginas de 2000 filas del screener (>1: descarga en paralelo)
         }
         
         # Insiders relevantes (C-suite only)
@@ -48,6 +84,14 @@ class IntelligentInsiderScraper:
             'ceo', 'chief executive', 'founder', 'co-founder', '10%'
         ]
         
+        # Session HTTP reutilizable (keep-alive); requests ya negocia gzip/deflate
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        
+        # Regex precompilados para filtrar titles (case-insensitive, sin copiar la columna a lower)
+        self._relevant_title_re = re.compile('|'.join(map(re.escape, self.relevant_insiders)), re.IGNORECASE)
+        self._whale_title_re = re.compile('|'.join(map(re.escape, self.whale_insiders)), re.IGNORECASE)
+        
     def scrape_recent_insider_data(self):
         """Scrape datos con ventana extendida - COMPRAS Y VENTAS"""
         print(f" Scraping últimos {self.config['days_back']} días (COMPRAS + VENTAS)...")
@@ -63,64 +107,53 @@ class IntelligentInsiderScraper:
 
         # URL SIN FILTRO de transaction type - captura TODO (compras Y ventas)
         # Removido: &xp=1 (purchases only) y &xs=1 (sales only)
-        url = f'http://openinsider.com/screener?s=&o=&pl=&ph=&ll=&lh=&fd=-1&fdr={start_str}+-+{end_str}&td=0&tdr=&fdlyl=&fdlyh=&daysago=&vl=&vh=&ocl=&och=&sic1=-1&sicl=100&sich=9999&grp=0&nfl=&nfh=&nil=&nih=&nol=&noh=&v2l=&v2h=&oc2l=&oc2h=&sortcol=0&cnt=2000&page=1'
+        url_template = f'http://openinsider.com/screener?s=&o=&pl=&ph=&ll=&lh=&fd=-1&fdr={start_str}+-+{end_str}&td=0&tdr=&fdlyl=&fdlyh=&daysago=&vl=&vh=&ocl=&och=&sic1=-1&sicl=100&sich=9999&grp=0&nfl=&nfh=&nil=&nih=&nol=&noh=&v2l=&v2h=&oc2l=&oc2h=&sortcol=0&cnt=2000&page={{page}}'
         
         try:
-            print(" Descargando datos...")
-            response = requests.get(url, timeout=45)
-            response.raise_for_status()
+            # Páginas de 2000 filas sobre la misma session; con max_pages > 1 se descargan en paralelo
+            urls = [url_template.format(page=page) for page in range(1, self.config['max_pages'] + 1)]
+            print(f" Descargando datos ({len(urls)} página/s)...")
+            if len(urls) == 1:
+                tables = [self._fetch_raw_table(urls[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(len(urls), 8)) as executor:
+                    tables = list(executor.map(self._fetch_raw_table, urls))
+
+            if tables[0] is None:
+                raise Exception("No se encontró tabla de datos")
+            raw = pd.concat([table for table in tables if table is not None], ignore_index=True)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            table = soup.find('table', {'class': 'tinytable'})
+            print(f" Filas raw encontradas: {len(raw)}")
             
-            if not table:
-                raise Exception("No se encontró tabla de datos")
-                
-            tbody = table.find('tbody')
-            rows = tbody.find_all('tr')
+            # Campos básicos (title/transaction_type como category: pocos valores distintos, los
+            # .str.contains de ventas/whales/filtros se evalúan una vez por categoría)
+            df = pd.DataFrame({
+                'filing_date': raw['filing_date'].str.strip(),
+                'trade_date': raw['trade_date'].str.strip(),
+                'ticker': raw['ticker'].str.strip().str.upper(),
+                'company_name': raw['company_name'].str.strip(),
+                'insider_name': raw['insider_name'].str.strip(),
+                'title': raw['title'].str.strip().astype('category'),
+                'transaction_type': raw['transaction_type'].str.strip().astype('category'),
+            })
             
-            print(f" Filas raw encontradas: {len(rows)}")
+            # Campos numéricos - LIMPIEZA CRÍTICA (vectorizada por columna)
+            df['price'] = self._clean_numeric(raw['price'])  # PRECIO DE COMPRA INSIDER
+            df['qty'] = self._clean_numeric(raw['qty'])
+            df['shares_owned'] = self._clean_numeric(raw['shares_owned'])
+            df['ownership_change'] = self._clean_percent(raw['ownership_change'])
+            df['transaction_value'] = self._clean_numeric(raw['transaction_value'])
             
-            # Extraer y limpiar datos
-            data = []
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) < 13:
-                    continue
-                    
-                # Extraer datos limpios
-                row_data = {}
-                
-                # Campos básicos
-                row_data['filing_date'] = self._clean_text(cols[1])
-                row_data['trade_date'] = self._clean_text(cols[2])
-                row_data['ticker'] = self._clean_text(cols[3]).upper()
-                row_data['company_name'] = self._clean_text(cols[4])
-                row_data['insider_name'] = self._clean_text(cols[5])
-                row_data['title'] = self._clean_text(cols[6])
-                row_data['transaction_type'] = self._clean_text(cols[7])
-                
-                # Campos numéricos - LIMPIEZA CRÍTICA
-                row_data['price'] = self._clean_numeric(cols[8])  # PRECIO DE COMPRA INSIDER
-                row_data['qty'] = self._clean_numeric(cols[9])
-                row_data['shares_owned'] = self._clean_numeric(cols[10])
-                row_data['ownership_change'] = self._clean_percent(cols[11])
-                row_data['transaction_value'] = self._clean_numeric(cols[12])
-                
-                # Calcular días desde trade
-                row_data['days_since_trade'] = self._calculate_days_since(row_data['trade_date'])
-                
-                # Solo procesar si tenemos datos válidos
-                if (row_data['ticker'] and 
-                    row_data['transaction_value'] != 0 and
-                    row_data['qty'] != 0 and
-                    row_data['price'] > 0):  # Precio válido crítico
-                    data.append(row_data)
+            # Calcular días desde trade
+            df['days_since_trade'] = self._calculate_days_since(df['trade_date'])
             
-            print(f" Datos limpios extraídos: {len(data)} transacciones")
+            # Solo procesar si tenemos datos válidos
+            df = df[(df['ticker'] != '') &
+                    (df['transaction_value'] != 0) &
+                    (df['qty'] != 0) &
+                    (df['price'] > 0)].reset_index(drop=True)  # Precio válido crítico
             
-            # Crear DataFrame
-            df = pd.DataFrame(data)
+            print(f" Datos limpios extraídos: {len(df)} transacciones")
             
             # Guardar datos raw
             df.to_csv(self.raw_csv, index=False)
@@ -132,100 +165,102 @@ class IntelligentInsiderScraper:
             print(f" ERROR scraping: {e}")
             return None
     
-    def _calculate_days_since(self, trade_date_str):
-        """Calcula días desde el trade"""
+    def _fetch_raw_table(self, url):
+        """Descarga (o lee del cache) una página del screener y retorna la tabla como texto (None si no hay tabla)"""
+        html = self.cache.get('openinsider', url, self.ttl_html)
+        cached = html is not None
+        if not cached:
+            response = self.session.get(url, timeout=45)
+            response.raise_for_status()
+            html = response.text
+
+        # Parsear la tabla con lxml; todas las celdas como texto (la limpieza es nuestra)
         try:
-            trade_date = datetime.strptime(trade_date_str, '%Y-%m-%d')
-            return (datetime.now() - trade_date).days
-        except:
-            return 999  # Fecha inválida
+            raw = pd.read_html(StringIO(html), attrs={'class': 'tinytable'}, flavor='lxml',
+                               header=0, keep_default_na=False, converters=self.RAW_CONVERTERS)[0]
+        except ValueError:
+            return None
+
+        # Cachear solo páginas con tabla (no páginas de error/mantenimiento con status 200)
+        if not cached:
+            self.cache.set('openinsider', url, html)
+
+        # Filas con menos de 13 columnas llegan rellenadas con celdas vacías al final
+        raw = raw.iloc[:, :len(self.RAW_COLUMNS)]
+        raw = raw[raw.iloc[:, -1].fillna('') != '']
+        raw.columns = self.RAW_COLUMNS
+        return raw
     
-    def _clean_text(self, cell):
-        """Limpia texto de celdas HTML"""
-        link = cell.find('a')
-        text = link.text.strip() if link else cell.text.strip()
-        return text
+    @staticmethod
+    def _calculate_days_since(trade_dates):
+        """Calcula días desde el trade para una columna de fechas 'YYYY-MM-DD'"""
+        trade_dates = pd.to_datetime(trade_dates, format='%Y-%m-%d', errors='coerce')
+        days = (pd.Timestamp(datetime.now()) - trade_dates).dt.days
+        return days.fillna(999).astype('int32')  # 999 = fecha inválida; int32 sobra para días
     
-    def _clean_numeric(self, cell):
-        """Limpia valores numéricos - MANEJA SÍMBOLOS"""
-        text = self._clean_text(cell)
-        if not text or text.lower() in ['n/a', 'new', '']:
-            return 0.0
-        
-        # Remover símbolos comunes: $, +, -, ,, espacios
-        clean = re.sub(r'[\$\,\s]', '', text)
-        
-        # Manejar signo negativo
-        is_negative = clean.startswith('-')
-        if is_negative:
-            clean = clean[1:]
-        elif clean.startswith('+'):
-            clean = clean[1:]
-            
-        try:
-            value = float(clean)
-            return -value if is_negative else value
-        except ValueError:
-            return 0.0
+    @staticmethod
+    def _clean_numeric(column):
+        """Limpia una columna de valores numéricos - MANEJA SÍMBOLOS ($, +, -, comas, espacios)"""
+        clean = column.str.replace(_NUM_RE, '', regex=True).str.replace(_PLUS_SIGN_RE, '', regex=True)
+        # 'n/a', 'New', vacíos y basura -> NaN -> 0.0
+        return pd.to_numeric(clean, errors='coerce').astype(float).fillna(0.0)
     
-    def _clean_percent(self, cell):
-        """Limpia porcentajes"""
-        text = self._clean_text(cell)
-        if not text or text.lower() in ['n/a', 'new']:
-            return 0.0
-            
-        # Remover % y otros símbolos
-        clean = re.sub(r'[\%\,\s]', '', text)
-        
-        is_negative = clean.startswith('-')
-        if is_negative:
-            clean = clean[1:]
-        elif clean.startswith('+'):
-            clean = clean[1:]
-            
-        try:
-            value = float(clean)
-            return -value if is_negative else value
-        except ValueError:
-            return 0.0
+    @staticmethod
+    def _clean_percent(column):
+        """Limpia una columna de porcentajes"""
+        clean = column.str.replace(_PCT_RE, '', regex=True).str.replace(_PLUS_SIGN_RE, '', regex=True)
+        return pd.to_numeric(clean, errors='coerce').astype(float).fillna(0.0)
+    
+    def compute_masks(self, df):
+        """Masks booleanos compartidos por ventas, whales y clusters (cada .str se evalúa una sola vez)"""
+        return {
+            'is_purchase': df['transaction_type'].str.contains('P - Purchase', na=False),
+            'is_sale': df['transaction_type'].str.contains('S - Sale', na=False),
+            'title_relevant': df['title'].str.contains(self._relevant_title_re, na=False),
+            'title_whale': df['title'].str.contains(self._whale_title_re, na=False),
+            'ticker_ok': df['ticker'].str.len().between(1, 5),
+            'price_ok': df['price'] > 0,
+            'abs_value': df['transaction_value'].abs(),
+        }
     
-    def detect_insider_sales(self, df):
+    def detect_insider_sales(self, df, masks=None):
         """Detecta y procesa VENTAS de insiders (NUEVO)"""
         print(f"\n Detectando VENTAS de insiders...")
+        if masks is None:
+            masks = self.compute_masks(df)
 
         # Filtrar solo ventas de C-suite
         sales_df = df[
-            (df['transaction_type'].str.contains('S - Sale', na=False)) &
-            (df['title'].str.lower().str.contains('|'.join(self.relevant_insiders), na=False)) &
-            (df['ticker'].str.len().between(1, 5)) &
-            (df['price'] > 0) &
-            (abs(df['transaction_value']) >= 100000)  # Mínimo $100K en ventas
+            masks['is_sale'] &
+            masks['title_relevant'] &
+            masks['ticker_ok'] &
+            masks['price_ok'] &
+            (masks['abs_value'] >= 100000)  # Mínimo $100K en ventas
         ].copy()
 
         print(f" Ventas detectadas: {len(sales_df)}")
-
-        # Preparar datos de ventas
-        sales_records = []
-
-        for _, row in sales_df.iterrows():
-            sale = {
-                'ticker': row['ticker'],
-                'company_name': row['company_name'],
-                'insider_name': row['insider_name'],
-                'title': row['title'],
-                'sale_date': row['trade_date'],
-                'sale_price': round(row['price'], 2),
-                'qty_sold': int(abs(row['qty'])),
-                'sale_value_usd': int(abs(row['transaction_value'])),
-                'sale_value_millions': round(abs(row['transaction_value'])/1000000, 1),
-                'days_since_sale': row['days_since_trade'],
-                'shares_remaining': int(row['shares_owned']) if row['shares_owned'] > 0 else 0
-            }
-            sales_records.append(sale)
+        if sales_df.empty:
+            return []
+
+        # Registros de ventas construidos por columna
+        value = sales_df['transaction_value'].abs()
+        sales_df_final = pd.DataFrame({
+            'ticker': sales_df['ticker'],
+            'company_name': sales_df['company_name'],
+            'insider_name': sales_df['insider_name'],
+            'title': sales_df['title'],
+            'sale_date': sales_df['trade_date'],
+            'sale_price': sales_df['price'].round(2),
+            'qty_sold': sales_df['qty'].abs().astype('int64'),
+            'sale_value_usd': value.astype('int64'),
+            'sale_value_millions': _py_round(value / 1000000, 1),
+            'days_since_sale': sales_df['days_since_trade'],
+            'shares_remaining': sales_df['shares_owned'].clip(lower=0).astype('int64')
+        })
+        sales_records = sales_df_final.to_dict('records')
 
         # Guardar ventas
         if sales_records:
-            sales_df_final = pd.DataFrame(sales_records)
             sales_df_final.to_csv(self.sales_csv, index=False)
             print(f" Ventas guardadas: {self.sales_csv}")
 
@@ -237,81 +272,63 @@ class IntelligentInsiderScraper:
 
         return sales_records
 
-    def detect_whale_trades(self, df):
+    def detect_whale_trades(self, df, masks=None):
         """Detecta whale trades ($99M+)"""
         print(f"\n Detectando WHALE TRADES...")
+        if masks is None:
+            masks = self.compute_masks(df)
 
         # Filtros para whales
         whale_df = df[
-            (abs(df['transaction_value']) >= self.config['whale_threshold']) &
-            (df['transaction_type'].str.contains('P - Purchase', na=False)) &
-            (df['title'].str.lower().str.contains('|'.join(self.whale_insiders), na=False)) &
-            (df['ticker'].str.len().between(1, 5)) &
-            (df['price'] > 0)  # Precio válido
+            (masks['abs_value'] >= self.config['whale_threshold']) &
+            masks['is_purchase'] &
+            masks['title_whale'] &
+            masks['ticker_ok'] &
+            masks['price_ok']  # Precio válido
         ].copy()
         
         print(f" Whale trades encontrados: {len(whale_df)}")
-        
-        # Preparar datos whale
-        whale_opportunities = []
-        
-        for _, row in whale_df.iterrows():
-            # Clasificar freshness
-            days = row['days_since_trade']
-            if days <= 7:
-                freshness = 'fresh'
-                freshness_score = 30
-            elif days <= 21:
-                freshness = 'recent'
-                freshness_score = 20
-            else:
-                freshness = 'old'
-                freshness_score = 10
-            
-            # Clasificar confidence
-            title = row['title'].lower()
-            if any(word in title for word in ['ceo', 'chief executive', 'founder', 'co-founder']):
-                confidence = 'high'
-                confidence_score = 30
-            elif '10%' in title:
-                confidence = 'high'
-                confidence_score = 25
-            else:
-                confidence = 'medium'
-                confidence_score = 15
-            
-            # Score whale
-            whale_score = min(
-                40 +  # Base whale score
-                freshness_score +
-                confidence_score,
-                100
-            )
-            
-            whale_opp = {
-                'type': 'whale',
-                'ticker': row['ticker'],
-                'company_name': row['company_name'],
-                'insider_name': row['insider_name'],
-                'title': row['title'],
-                'purchase_value_usd': int(abs(row['transaction_value'])),
-                'purchase_value_millions': round(abs(row['transaction_value'])/1000000, 1),
-                'purchase_price': round(row['price'], 2),
-                'purchase_date': row['trade_date'],
-                'days_since_trade': days,
-                'freshness': freshness,
-                'confidence': confidence,
-                'whale_score': round(whale_score, 1),
-                'qty_purchased': int(row['qty']) if row['qty'] > 0 else 0
-            }
-            
-            whale_opportunities.append(whale_opp)
+        if whale_df.empty:
+            return []
+        
+        # Clasificar freshness
+        days = whale_df['days_since_trade']
+        freshness = np.select([days <= 7, days <= 21], ['fresh', 'recent'], default='old')
+        freshness_score = np.select([days <= 7, days <= 21], [30, 20], default=10)
+        
+        # Clasificar confidence
+        title = whale_df['title'].str.lower()
+        is_executive = title.str.contains('ceo|chief executive|founder', na=False)  # incluye co-founder
+        is_major_holder = title.str.contains('10%', regex=False, na=False)
+        confidence = np.where(is_executive | is_major_holder, 'high', 'medium')
+        confidence_score = np.select([is_executive, is_major_holder], [30, 25], default=15)
+        
+        # Score whale: base 40 + freshness + confidence
+        whale_score = np.minimum(40 + freshness_score + confidence_score, 100)
+        
+        value = whale_df['transaction_value'].abs()
+        whale_df_final = pd.DataFrame({
+            'type': 'whale',
+            'ticker': whale_df['ticker'],
+            'company_name': whale_df['company_name'],
+            'insider_name': whale_df['insider_name'],
+            'title': whale_df['title'],
+            'purchase_value_usd': value.astype('int64'),
+            'purchase_value_millions': _py_round(value / 1000000, 1),
+            'purchase_price': whale_df['price'].round(2),
+            'purchase_date': whale_df['trade_date'],
+            'days_since_trade': days,
+            'freshness': freshness,
+            'confidence': confidence,
+            'whale_score': whale_score,
+            'qty_purchased': whale_df['qty'].clip(lower=0).astype('int64')
+        })
         
         # Ordenar por score y guardar
-        whale_opportunities.sort(key=lambda x: x['whale_score'], reverse=True)
+        whale_df_final = whale_df_final.sort_values('whale_score', ascending=False, kind='stable')
+        whale_opportunities = whale_df_final.to_dict('records')
         
         if whale_opportunities:
-            whale_df_final = pd.DataFrame(whale_opportunities)
             whale_df_final.to_csv(self.whale_csv, index=False)
             print(f" Whale opportunities guardadas: {self.whale_csv}")
             
@@ -324,37 +341,43 @@ class IntelligentInsiderScraper:
         
         return whale_opportunities
     
-    def apply_intelligent_filters(self, df):
+    def apply_intelligent_filters(self, df, masks=None):
         """Aplica filtros inteligentes para clusters (no whales)"""
+        original_count = len(df)
         print(f"\n Aplicando filtros para CLUSTER DETECTION...")
-        print(f" Datos iniciales: {len(df)} transacciones")
+        print(f" Datos iniciales: {original_count} transacciones")
+        if df.empty:
+            return df
+        if masks is None:
+            masks = self.compute_masks(df)
         
-        original_count = len(df)
+        min_value = self.config['min_purchase_value']
+        max_value = self.config['whale_threshold'] - 1  # Excluir whales
+        abs_value = masks['abs_value']
         
+        # Un solo mask acumulado; los conteos intermedios salen de sumar booleanos
         # 1. Solo compras (P - Purchase)
-        df = df[df['transaction_type'].str.contains('P - Purchase', na=False)]
-        print(f" Solo compras: {len(df)} ({len(df)/original_count*100:.1f}%)")
+        mask = masks['is_purchase'].copy()
+        purchase_count = mask.sum()
+        print(f" Solo compras: {purchase_count} ({purchase_count/original_count*100:.1f}%)")
         
         # 2. Valor mínimo pero NO whale threshold
-        min_value = self.config['min_purchase_value']
-        max_value = self.config['whale_threshold'] - 1  # Excluir whales
-        df = df[
-            (abs(df['transaction_value']) >= min_value) & 
-            (abs(df['transaction_value']) < max_value)
-        ]
-        print(f" Valor ${min_value/1000000:.1f}M-${max_value/1000000:.0f}M: {len(df)} transacciones")
+        mask &= (abs_value >= min_value) & (abs_value < max_value)
+        print(f" Valor ${min_value/1000000:.1f}M-${max_value/1000000:.0f}M: {mask.sum()} transacciones")
         
         # 3. Solo insiders relevantes (C-suite)
-        df = df[df['title'].str.lower().str.contains('|'.join(self.relevant_insiders), na=False)]
-        print(f" Solo C-suite: {len(df)} transacciones")
+        mask &= masks['title_relevant']
+        print(f" Solo C-suite: {mask.sum()} transacciones")
         
         # 4. Filtrar tickers válidos
-        df = df[df['ticker'].str.len().between(1, 5)]
-        print(f" Tickers válidos: {len(df)} transacciones")
+        mask &= masks['ticker_ok']
+        print(f" Tickers válidos: {mask.sum()} transacciones")
         
         # 5. Precio válido
-        df = df[df['price'] > 0]
-        print(f" Precios válidos: {len(df)} transacciones")
+        mask &= masks['price_ok']
+        print(f" Precios válidos: {mask.sum()} transacciones")
+        
+        df = df[mask]
         
         # 6. Eliminar duplicados exactos
         df = df.drop_duplicates(subset=['ticker', 'insider_name', 'trade_date', 'transaction_value'])
@@ -365,164 +388,118 @@ class IntelligentInsiderScraper:
     def detect_cluster_buying(self, df):
         """Detecta patrones de cluster buying (múltiples insiders)"""
         print(f"\n Detectando CLUSTER BUYING patterns...")
-        
-        # Agrupar por ticker
-        clusters = defaultdict(list)
-        
-        for _, row in df.iterrows():
-            ticker = row['ticker']
-            clusters[ticker].append({
-                'insider': row['insider_name'],
-                'title': row['title'],
-                'value': abs(row['transaction_value']),
-                'price': row['price'],  # PRECIO DE COMPRA CRÍTICO
-                'date': row['trade_date'],
-                'days_since': row['days_since_trade'],
-                'qty': row['qty']
-            })
-        
-        # Analizar clusters
-        cluster_results = []
-        
-        for ticker, purchases in clusters.items():
-            if len(purchases) >= 1:  # Al menos 1 compra
-                total_value = sum(p['value'] for p in purchases)
-                insider_count = len(set(p['insider'] for p in purchases))
-                
-                # Calcular precio promedio ponderado por valor
-                total_purchase_value = sum(p['value'] for p in purchases)
-                weighted_price = sum(p['price'] * p['value'] for p in purchases) / total_purchase_value
-                
-                # Días desde última compra
-                latest_date = max(p['date'] for p in purchases)
-                days_since_latest = min(p['days_since'] for p in purchases)
-                
-                # Clasificar freshness del cluster
-                if days_since_latest <= 7:
-                    freshness = 'fresh'
-                elif days_since_latest <= 21:
-                    freshness = 'recent'
-                else:
-                    freshness = 'old'
-                
-                # Calcular score
-                score = self._calculate_cluster_score(purchases, total_value, insider_count, days_since_latest)
-                
-                cluster_results.append({
-                    'type': 'cluster',
-                    'ticker': ticker,
-                    'insider_count': insider_count,
-                    'total_value': total_value,
-                    'avg_value': total_value / len(purchases),
-                    'avg_purchase_price': round(weighted_price, 2),  # PRECIO PROMEDIO PONDERADO
-                    'latest_purchase': latest_date,
-                    'days_since_latest': days_since_latest,
-                    'freshness': freshness,
-                    'score': score,
-                    'purchases': purchases
-                })
-        
-        # Ordenar por score
-        cluster_results.sort(key=lambda x: x['score'], reverse=True)
-        
-        print(f" Clusters detectados: {len(cluster_results)}")
+        if df.empty:
+            print(f" Clusters detectados: 0")
+            return pd.DataFrame(columns=self.CLUSTER_COLUMNS)
+        
+        # Agrupar por ticker (orden de primera aparición)
+        purchases_df = df.assign(value=df['transaction_value'].abs())
+        grouped = purchases_df.groupby('ticker', sort=False)
+        clusters = grouped.agg(
+            insider_count=('insider_name', 'nunique'),
+            total_value=('value', 'sum'),
+            n_purchases=('value', 'size'),
+            latest_purchase=('trade_date', 'max'),
+            days_since_latest=('days_since_trade', 'min'),
+        )
+        
+        # Calcular precio promedio ponderado por valor
+        weighted_value = (purchases_df['price'] * purchases_df['value']).groupby(purchases_df['ticker'], sort=False).sum()
+        clusters['avg_value'] = clusters['total_value'] / clusters['n_purchases']
+        clusters['avg_purchase_price'] = (weighted_value / clusters['total_value']).round(2)  # PRECIO PROMEDIO PONDERADO
+        
+        # Clasificar freshness del cluster
+        days_since_latest = clusters['days_since_latest']
+        clusters['freshness'] = np.select([days_since_latest <= 7, days_since_latest <= 21], ['fresh', 'recent'], default='old')
+        
+        # Calcular score
+        clusters['score'] = self._calculate_cluster_score(purchases_df, clusters)
+        
+        print(f" Clusters detectados: {len(clusters)}")
+        
+        # Solo clusters que pasan el threshold (los únicos que se guardan), ordenados por score
+        kept = clusters[clusters['score'] >= self.config['min_cluster_score']]
+        kept = kept.sort_values('score', ascending=False, kind='stable')
+        
+        # Detalle de insiders solo para los clusters retenidos
+        survivors = purchases_df[purchases_df['ticker'].isin(kept.index)]
+        # "Nombre (Title: $X.XM @ $Y.YY)" concatenando columnas; printf en C para los números
+        value_millions = pd.Series(np.char.mod('%.1f', survivors['value'].to_numpy() / 1000000), index=survivors.index)
+        price = pd.Series(np.char.mod('%.2f', survivors['price'].to_numpy()), index=survivors.index)
+        detail = (survivors['insider_name'] + ' (' + survivors['title'].astype(str) + ': $' + value_millions
+                  + 'M @ $' + price + ')').astype(object)
+        kept = kept.assign(insiders_detail=detail.groupby(survivors['ticker'], sort=False).agg(' | '.join))
+        
+        cluster_df = kept.reset_index().assign(type='cluster')[self.CLUSTER_COLUMNS]
         
         # Mostrar top clusters
         print(f"\n TOP CLUSTERS:")
-        for i, cluster in enumerate(cluster_results[:5], 1):
-            print(f"{i}. {cluster['ticker']}: {cluster['insider_count']} insiders, "
-                  f"${cluster['total_value']/1000000:.1f}M @ ${cluster['avg_purchase_price']:.2f} avg "
-                  f"(Score: {cluster['score']:.1f})")
+        for i, cluster in enumerate(cluster_df.head(5).itertuples(index=False), 1):
+            print(f"{i}. {cluster.ticker}: {cluster.insider_count} insiders, "
+                  f"${cluster.total_value/1000000:.1f}M @ ${cluster.avg_purchase_price:.2f} avg "
+                  f"(Score: {cluster.score:.1f})")
         
-        return cluster_results
+        return cluster_df
     
-    def _calculate_cluster_score(self, purchases, total_value, insider_count, days_since):
-        """Calcula score realista para cluster con freshness"""
-        score = 0
-        
-        # 1. Valor total (0-25 puntos)
-        if total_value >= 5000000:      # $5M+
-            score += 25
-        elif total_value >= 2000000:    # $2M+
-            score += 20
-        elif total_value >= 1000000:    # $1M+
-            score += 15
-        elif total_value >= 500000:     # $500K+
-            score += 10
+    def _calculate_cluster_score(self, purchases_df, clusters):
+        """Calcula score realista por cluster con freshness (vectorizado sobre los clusters)"""
+        # 1. Valor total (0-25 puntos): $5M+ | $2M+ | $1M+ | $500K+
+        total_value = clusters['total_value']
+        value_score = np.select(
+            [total_value >= 5000000, total_value >= 2000000, total_value >= 1000000, total_value >= 500000],
+            [25, 20, 15, 10],
+            default=0
+        )
         
         # 2. Cluster effect (0-25 puntos)
-        if insider_count >= 3:
-            score += 25
-        elif insider_count >= 2:
-            score += 20
-        else:
-            score += 10  # Single insider
-        
-        # 3. Insider quality (0-25 puntos)
-        max_insider_score = 0
-        for purchase in purchases:
-            title = purchase['title'].lower()
-            if any(word in title for word in ['ceo', 'chief executive']):
-                max_insider_score = max(max_insider_score, 25)
-            elif any(word in title for word in ['cfo', 'chief financial']):
-                max_insider_score = max(max_insider_score, 20)
-            elif any(word in title for word in ['founder', 'co-founder']):
-                max_insider_score = max(max_insider_score, 25)
-            elif '10%' in title:
-                max_insider_score = max(max_insider_score, 20)
-            elif any(word in title for word in ['president', 'chairman']):
-                max_insider_score = max(max_insider_score, 15)
-            else:
-                max_insider_score = max(max_insider_score, 8)
-        
-        score += max_insider_score
+        insider_count = clusters['insider_count']
+        cluster_score = np.select([insider_count >= 3, insider_count >= 2], [25, 20], default=10)  # 10 = single insider
+        
+        # 3. Insider quality (0-25 puntos): mejor title de cada cluster
+        title = purchases_df['title'].str.lower()
+        title_score = pd.Series(np.select(
+            [title.str.contains('ceo|chief executive', na=False),
+             title.str.contains('cfo|chief financial', na=False),
+             title.str.contains('founder', regex=False, na=False),
+             title.str.contains('10%', regex=False, na=False),
+             title.str.contains('president|chairman', na=False)],
+            [25, 20, 25, 20, 15],
+            default=8
+        ), index=purchases_df.index)
+        insider_score = title_score.groupby(purchases_df['ticker'], sort=False).max().reindex(clusters.index)
         
         # 4. Freshness bonus (0-25 puntos) - MÁS IMPORTANTE
-        if days_since <= 7:
-            score += 25  # Fresh
-        elif days_since <= 14:
-            score += 20  # Recent
-        elif days_since <= 21:
-            score += 15  # Still good
-        elif days_since <= 30:
-            score += 10  # Getting old
-        else:
-            score += 5   # Old
-        
-        return min(score, 100)
+        days_since = clusters['days_since_latest']
+        freshness_score = np.select(
+            [days_since <= 7, days_since <= 14, days_since <= 21, days_since <= 30],
+            [25, 20, 15, 10],  # Fresh | Recent | Still good | Getting old
+            default=5          # Old
+        )
+        
+        return (value_score + cluster_score + insider_score + freshness_score).clip(upper=100)
     
     def save_opportunities(self, clusters):
-        """Guarda oportunidades cluster filtradas"""
-        opportunities = []
-        
-        for cluster in clusters:
-            if cluster['score'] >= 50:  # Threshold mínimo
-                # Crear registro detallado
-                opp = {
-                    'type': 'cluster',
-                    'ticker': cluster['ticker'],
-                    'score': round(cluster['score'], 1),
-                    'insider_count': cluster['insider_count'],
-                    'total_value_usd': int(cluster['total_value']),
-                    'total_value_millions': round(cluster['total_value']/1000000, 1),
-                    'avg_purchase_value': int(cluster['avg_value']),
-                    'avg_purchase_price': cluster['avg_purchase_price'],  # PRECIO PROMEDIO
-                    'latest_purchase': cluster['latest_purchase'],
-                    'days_since_latest': cluster['days_since_latest'],
-                    'freshness': cluster['freshness']
-                }
-                
-                # Agregar detalles de insiders
-                insiders_detail = []
-                for purchase in cluster['purchases']:
-                    insiders_detail.append(f"{purchase['insider']} ({purchase['title']}: ${purchase['value']/1000000:.1f}M @ ${purchase['price']:.2f})")
-                
-                opp['insiders_detail'] = ' | '.join(insiders_detail)
-                opportunities.append(opp)
+        """Guarda oportunidades cluster filtradas (clusters = DataFrame de detect_cluster_buying)"""
+        clusters = clusters[clusters['score'] >= self.config['min_cluster_score']]  # Threshold mínimo
+        
+        df_opp = pd.DataFrame({
+            'type': 'cluster',
+            'ticker': clusters['ticker'],
+            'score': clusters['score'],
+            'insider_count': clusters['insider_count'],
+            'total_value_usd': clusters['total_value'].astype('int64'),
+            'total_value_millions': _py_round(clusters['total_value'] / 1000000, 1),
+            'avg_purchase_value': clusters['avg_value'].astype('int64'),
+            'avg_purchase_price': clusters['avg_purchase_price'],  # PRECIO PROMEDIO
+            'latest_purchase': clusters['latest_purchase'],
+            'days_since_latest': clusters['days_since_latest'],
+            'freshness': clusters['freshness'],
+            'insiders_detail': clusters['insiders_detail']
+        })
+        opportunities = df_opp.to_dict('records')
         
         # Guardar CSV
         if opportunities:
-            df_opp = pd.DataFrame(opportunities)
             df_opp.to_csv(self.filtered_csv, index=False)
             print(f" Cluster opportunities guardadas: {self.filtered_csv}")
             print(f" Total cluster opportunities: {len(opportunities)}")
@@ -658,14 +635,17 @@ def main():
         print(" SCRAPING FALLIDO")
         sys.exit(1)
 
+    # Masks de filtros calculados una vez para ventas, whales y clusters
+    masks = scraper.compute_masks(df)
+
     # 2. Detectar VENTAS de insiders (NUEVO)
-    sales_records = scraper.detect_insider_sales(df)
+    sales_records = scraper.detect_insider_sales(df, masks)
 
     # 3. Detectar WHALE TRADES
-    whale_opportunities = scraper.detect_whale_trades(df)
+    whale_opportunities = scraper.detect_whale_trades(df, masks)
 
     # 4. Filtros para CLUSTERS (excluye whales)
-    df_filtered = scraper.apply_intelligent_filters(df)
+    df_filtered = scraper.apply_intelligent_filters(df, masks)
 
     # 5. Detección de CLUSTERS
     clusters = scraper.detect_cluster_buying(df_filtered)
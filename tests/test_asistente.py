@@ -0,0 +1,210 @@
+"""Tests de ResearchAssistant: los records conservan los tipos de los dicts del scraper"""
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core'))
+
+import asistente  # noqa: E402
+from asistente import ENRICHED_COLUMNS, ResearchAssistant, TokenBucket  # noqa: E402
+
+# Mismos tipos que producen scraper.save_opportunities / detect_whale_trades
+CLUSTERS = [{
+    'type': 'cluster', 'ticker': 'AAA', 'score': 100, 'insider_count': 6,
+    'total_value_usd': 6000000, 'total_value_millions': 6.0, 'avg_purchase_value': 1000000,
+    'avg_purchase_price': 10.0, 'latest_purchase': '2026-10-01', 'days_since_latest': 0,
+    'freshness': 'fresh', 'insiders_detail': 'Bob (CEO: $6.0M @ $10.00)'
+}]
+WHALES = [{
+    'type': 'whale', 'ticker': 'DDD', 'company_name': 'Ddd Inc', 'insider_name': 'Wh Ale', 'title': 'CEO',
+    'purchase_value_usd': 150000000, 'purchase_value_millions': 150.0, 'purchase_price': 30.0,
+    'purchase_date': '2026-10-05', 'days_since_trade': 1, 'freshness': 'fresh', 'confidence': 'high',
+    'whale_score': 100, 'qty_purchased': 2600916
+}]
+MARKET_DATA = {
+    'AAA': {'current_price': 11.0, 'day_change_percent': 4.76, 'market_cap': 60000.0, 'pe_ratio': 12.34,
+            'industry': 'Tech', '52w_high': 20.0, '52w_low': 8.0},
+    'DDD': {'current_price': 36.0, 'day_change_percent': 2.86, 'market_cap': 3000.0, 'pe_ratio': 20.0,
+            'industry': 'Energy', '52w_high': 100.0, '52w_low': 20.0},
+}
+
+
+class ToRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.assistant = ResearchAssistant(data_dir=tempfile.mkdtemp())
+        enriched = self.assistant.analyze_opportunities(CLUSTERS, WHALES, MARKET_DATA)
+        self.records = {r['type']: r for r in self.assistant.to_records(enriched)}
+
+    def assert_same_types(self, record, original):
+        for key, value in original.items():
+            self.assertEqual(record[key], value, key)
+            self.assertIs(type(record[key]), type(value), key)
+
+    def test_cluster_keeps_scraper_types(self):
+        self.assert_same_types(self.records['cluster'], CLUSTERS[0])
+        self.assertNotIn('whale_score', self.records['cluster'])
+
+    def test_whale_keeps_scraper_types(self):
+        self.assert_same_types(self.records['whale'], WHALES[0])
+        self.assertNotIn('insider_count', self.records['whale'])
+
+    def test_report_column_order(self):
+        enriched = self.assistant.analyze_opportunities(CLUSTERS, WHALES, MARKET_DATA)
+        whale_only = [col for col in WHALES[0] if col not in CLUSTERS[0]]
+        self.assertEqual(list(enriched.columns), list(CLUSTERS[0]) + ENRICHED_COLUMNS + whale_only)
+
+    def test_missing_pe_is_none(self):
+        market_data = {ticker: dict(data, pe_ratio=0) for ticker, data in MARKET_DATA.items()}
+        enriched = self.assistant.analyze_opportunities(CLUSTERS, WHALES, market_data)
+        records = self.assistant.to_records(enriched)
+        self.assertEqual([r['pe_ratio'] for r in records], [None, None])
+        self.assertNotIn('NaN', json.dumps(records))
+
+
+class ResearchReportTest(unittest.TestCase):
+    def test_buckets_keep_dashboard_signals(self):
+        assistant = ResearchAssistant(data_dir=tempfile.mkdtemp())
+        enriched = assistant.analyze_opportunities(CLUSTERS, WHALES, MARKET_DATA)
+        report = assistant.generate_research_report(enriched)
+        for opp in report['top_research_targets']:
+            self.assertTrue(opp['research_signals'], opp['ticker'])  # templates/dashboard.html
+            self.assertNotIn('52w_high', opp)
+
+
+
+class LoadOpportunitiesTest(unittest.TestCase):
+    """CSV con una celda int vacía, texto vacío, una columna faltante y otra extra"""
+    CLUSTER_CSV = (
+        "type,ticker,score,insider_count,total_value_usd,total_value_millions,avg_purchase_value,"
+        "avg_purchase_price,latest_purchase,days_since_latest,freshness,extra\n"
+        "cluster,AAA,100,,6000000,6.0,1000000,10.0,2026-10-01,0,,x\n"
+    )
+
+    def setUp(self):
+        self.assistant = ResearchAssistant(data_dir=tempfile.mkdtemp())
+        self.assistant.opportunities_file.write_text(self.CLUSTER_CSV)
+        with open(self.assistant.whale_file, 'w') as f:
+            f.write(','.join(WHALES[0]) + '\n' + ','.join(map(str, WHALES[0].values())) + '\n')
+
+    def load(self, use_pyarrow):
+        with mock.patch.object(asistente, '_pyarrow_available', use_pyarrow):
+            return self.assistant.load_opportunities()
+
+    def test_blank_and_missing_cells(self):
+        engines = (False, True) if asistente._pyarrow_available else (False,)
+        for use_pyarrow in engines:
+            with self.subTest(pyarrow=use_pyarrow):
+                cluster_df, whale_df = self.load(use_pyarrow)
+                self.assertEqual(list(cluster_df.columns), list(asistente.CLUSTER_DTYPES))
+                row = cluster_df.iloc[0]
+                self.assertIs(row['insider_count'], pd.NA)
+                self.assertEqual(row['score'], 100)
+                self.assertEqual(row['latest_purchase'], '2026-10-01')
+                self.assertTrue(pd.isna(row['freshness']))        # no 'None'/'nan'
+                self.assertTrue(pd.isna(row['insiders_detail']))  # columna faltante
+
+                enriched = self.assistant.analyze_opportunities(cluster_df, whale_df, MARKET_DATA)
+                records = {r['type']: r for r in self.assistant.to_records(enriched)}
+                self.assertIsNone(records['cluster']['insider_count'])
+                self.assertIsNone(records['cluster']['freshness'])
+                self.assertEqual(records['whale']['whale_score'], 100)
+                self.assertIs(type(records['whale']['qty_purchased']), int)
+                report = self.assistant.generate_research_report(enriched)
+                self.assertEqual(report['summary']['total_opportunities'], 2)
+
+
+
+class TokenBucketTest(unittest.TestCase):
+    """Reloj simulado: time.sleep avanza time.monotonic"""
+
+    def setUp(self):
+        self.now = 100.0
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        mock.patch.object(asistente.time, 'monotonic', side_effect=lambda: self.now).start()
+        mock.patch.object(asistente.time, 'sleep', side_effect=sleep).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_burst_then_throttles_to_rate(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(self.sleeps, [])  # la ráfaga inicial no espera
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.sleeps, [0.5, 0.5])  # luego 1 permiso cada 1/rate segundos
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.now += 60  # inactivo: se repone, pero nunca por encima de capacity
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(self.sleeps, [])
+        bucket.acquire()
+        self.assertEqual(self.sleeps, [0.5])
+
+
+def response(status_code, payload=None, headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {}, json=mock.Mock(return_value=payload))
+
+
+class FinnhubBackoffTest(unittest.TestCase):
+    """_finnhub_get: reintenta solo ante 429, esperando Retry-After o backoff exponencial"""
+
+    def setUp(self):
+        self.assistant = ResearchAssistant(data_dir=tempfile.mkdtemp())
+        self.get = mock.patch.object(self.assistant.session, 'get').start()
+        self.sleep = mock.patch.object(asistente.time, 'sleep').start()
+        mock.patch.object(asistente.random, 'random', return_value=0.25).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_429_then_200_honors_retry_after(self):
+        self.get.side_effect = [response(429, headers={'Retry-After': '7'}), response(200, {'c': 10.5})]
+        self.assertEqual(self.assistant._finnhub_get('https://finnhub.io/api/v1/quote'), {'c': 10.5})
+        self.assertEqual(self.get.call_count, 2)
+        self.sleep.assert_called_once_with(7.25)
+
+    def test_429_without_valid_retry_after_backs_off_exponentially(self):
+        self.get.side_effect = [response(429), response(429, headers={'Retry-After': 'soon'}),
+                                response(200, {'c': 10.5})]
+        self.assertEqual(self.assistant._finnhub_get('https://finnhub.io/api/v1/quote'), {'c': 10.5})
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [1.25, 2.25])
+
+    def test_persistent_429_gives_up(self):
+        self.get.return_value = response(429)
+        self.assertIsNone(self.assistant._finnhub_get('https://finnhub.io/api/v1/quote'))
+        self.assertEqual(self.get.call_count, self.assistant.api_config['max_retries_429'] + 1)
+
+    def test_other_errors_are_not_retried(self):
+        self.get.return_value = response(404)
+        self.assertIsNone(self.assistant._finnhub_get('https://finnhub.io/api/v1/quote'))
+        self.get.assert_called_once()
+        self.sleep.assert_not_called()
+
+
+
+class FinnhubSessionTest(unittest.TestCase):
+    def test_adapter_retries_5xx_but_leaves_429_to_finnhub_get(self):
+        assistant = ResearchAssistant(data_dir=tempfile.mkdtemp())
+        retry = assistant.session.get_adapter('https://finnhub.io/api/v1/quote').max_retries
+        self.assertEqual(retry.total, assistant.api_config['max_retries_5xx'])
+        for status in (500, 502, 503, 504):
+            self.assertTrue(retry.is_retry('GET', status), status)
+        self.assertFalse(retry.is_retry('POST', 503))
+        self.assertFalse(retry.is_retry('GET', 429, has_retry_after=True))
+        self.assertFalse(retry.is_retry('GET', 404))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Tests de FileCache: TTL, expiración, archivos corruptos y escritura atómica"""
+import hashlib
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core'))
+
+import cache  # noqa: E402
+from cache import FileCache  # noqa: E402
+
+
+class FileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.cache = FileCache(self.root)
+
+    def test_fresh_hit(self):
+        self.cache.set('quote', 'AAPL', {'c': 10.5})
+        self.assertEqual(self.cache.get('quote', 'AAPL', ttl=60), {'c': 10.5})
+
+    def test_expired_miss(self):
+        with mock.patch.object(cache.time, 'time', return_value=1000.0):
+            self.cache.set('quote', 'AAPL', {'c': 10.5})
+        with mock.patch.object(cache.time, 'time', return_value=1059.0):
+            self.assertEqual(self.cache.get('quote', 'AAPL', ttl=60), {'c': 10.5})
+        with mock.patch.object(cache.time, 'time', return_value=1060.0):
+            self.assertIsNone(self.cache.get('quote', 'AAPL', ttl=60))
+
+    def test_missing_and_corrupt_files_miss(self):
+        self.assertIsNone(self.cache.get('quote', 'AAPL', ttl=60))
+        self.cache.set('quote', 'AAPL', {'c': 10.5})
+        self.cache._path('quote', 'AAPL').write_text('{"timestamp": 1')  # escritura truncada
+        self.assertIsNone(self.cache.get('quote', 'AAPL', ttl=60))
+
+    def test_md5_key_per_endpoint(self):
+        self.cache.set('quote', 'AAPL', {'c': 10.5})
+        self.cache.set('profile2', 'AAPL', {'name': 'Apple'})
+        digest = hashlib.md5(b'AAPL').hexdigest()
+        self.assertTrue((self.root / 'quote' / f"{digest}.json").exists())
+        self.assertEqual(self.cache.get('profile2', 'AAPL', ttl=60), {'name': 'Apple'})
+
+    def test_atomic_write_leaves_no_tmp_files(self):
+        self.cache.set('quote', 'AAPL', {'c': 10.5})
+        self.cache.set('quote', 'AAPL', {'c': 11.0})  # sobrescribe con os.replace
+        self.assertEqual([p.suffix for p in (self.root / 'quote').iterdir()], ['.json'])
+        self.assertEqual(self.cache.get('quote', 'AAPL', ttl=60), {'c': 11.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
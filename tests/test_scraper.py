@@ -0,0 +1,129 @@
+"""Tests de IntelligentInsiderScraper: parseo de la tabla de OpenInsider y detección sobre un HTML fijo"""
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core'))
+
+from scraper import IntelligentInsiderScraper  # noqa: E402
+
+HEADER = ['X', 'Filing Date', 'Trade Date', 'Ticker', 'Company Name', 'Insider Name', 'Title',
+          'Trade Type', 'Price', 'Qty', 'Owned', 'ΔOwn', 'Value', '1d', '1w', '1m', '6m']
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def row(days, ticker, insider, title, trade_type, price, qty, owned, own_change, value):
+    """Fila completa de 17 celdas como las de la tabla 'tinytable'"""
+    return [
+        '', f"{days_ago(days)} 16:05:11", days_ago(days), f'<a href="/{ticker}">{ticker}</a>',
+        f"{ticker.title()} Inc", f'<a href="/insider">{insider}</a>', title, trade_type,
+        price, qty, owned, own_change, value, '', '', '', ''
+    ]
+
+
+ROWS = [
+    row(2, 'AAA', 'Alice Ceo', 'CEO', 'P - Purchase', '$10.00', '+300,000', '1,000,000', '+43%', '+$3,000,000'),
+    row(5, 'AAA', 'Carl Cfo', 'CFO', 'P - Purchase', '$12.00', '+100,000', '100,000', 'New', '+$1,200,000'),
+    row(4, 'AAA', 'Dan Dir', 'Dir', 'P - Purchase', '$10.00', '+60,000', '60,000', 'New', '+$600,000'),
+    row(40, 'BBB', 'Pat Pres', 'President', 'P - Purchase', '$5.00', '+200,000', '200,000', '>999%', '+$1,000,000'),
+    row(1, 'WHL', 'Wh Ale', 'CEO, 10%', 'P - Purchase', '$50.00', '+3,000,000', '9,000,000', '+50%', '+$150,000,000'),
+    row(10, 'WH2', 'Big Fund', '10%', 'P - Purchase', '$60.00', '+2,000,000', '8,000,000', '+33%', '+$120,000,000'),
+    row(3, 'SSS', 'Sue Ceo', 'CEO', 'S - Sale', '$20.00', '-10,000', '0', '-100%', '-$200,000'),
+    row(6, 'CCC', 'Cy Cfo', 'CFO', 'S - Sale+OE', '$30.00', '-5,000', 'n/a', 'n/a', '-$150,000'),
+    ['', days_ago(1), days_ago(1), 'ZZZ', 'Short Row Inc'],  # menos de 13 celdas: se descarta
+]
+
+
+def page(rows):
+    cells = lambda tag, values: ''.join(f'<{tag}>{value}</{tag}>' for value in values)
+    body = ''.join(f'<tr>{cells("td", values)}</tr>' for values in rows)
+    return (f'<html><body><table class="tinytable"><thead><tr>{cells("th", HEADER)}</tr></thead>'
+            f'<tbody>{body}</tbody></table></body></html>')
+
+
+class ScraperFixtureTest(unittest.TestCase):
+    def setUp(self):
+        self.scraper = IntelligentInsiderScraper(output_dir=tempfile.mkdtemp())
+        self.get = mock.patch.object(self.scraper.session, 'get',
+                                     return_value=mock.Mock(text=page(ROWS))).start()
+        self.addCleanup(mock.patch.stopall)
+        self.df = self.scraper.scrape_recent_insider_data()
+        self.masks = self.scraper.compute_masks(self.df)
+
+    def test_parses_full_rows_only(self):
+        self.assertEqual(self.df['ticker'].tolist(), ['AAA', 'AAA', 'AAA', 'BBB', 'WHL', 'WH2', 'SSS', 'CCC'])
+        self.assertEqual(self.df['insider_name'][0], 'Alice Ceo')
+        self.assertEqual(self.df['days_since_trade'].tolist(), [2, 5, 4, 40, 1, 10, 3, 6])
+
+    def test_cleans_numeric_and_percent_cells(self):
+        self.assertEqual(self.df['ownership_change'].tolist(), [43.0, 0.0, 0.0, 0.0, 50.0, 33.0, -100.0, 0.0])
+        self.assertEqual(self.df['transaction_value'][6], -200000.0)
+        self.assertEqual(self.df['qty'][7], -5000.0)
+        self.assertEqual(self.df['shares_owned'][7], 0.0)
+
+    def test_clusters(self):
+        df_filtered = self.scraper.apply_intelligent_filters(self.df, self.masks)
+        clusters = self.scraper.detect_cluster_buying(df_filtered)
+        self.assertEqual(self.scraper.save_opportunities(clusters), [{
+            'type': 'cluster', 'ticker': 'AAA', 'score': 90, 'insider_count': 2,
+            'total_value_usd': 4200000, 'total_value_millions': 4.2, 'avg_purchase_value': 2100000,
+            'avg_purchase_price': 10.57, 'latest_purchase': days_ago(2), 'days_since_latest': 2,
+            'freshness': 'fresh',
+            'insiders_detail': 'Alice Ceo (CEO: $3.0M @ $10.00) | Carl Cfo (CFO: $1.2M @ $12.00)'
+        }])  # BBB: un solo insider, score 45 < 50
+
+    def test_whales(self):
+        whales = self.scraper.detect_whale_trades(self.df, self.masks)
+        self.assertEqual(whales, [
+            {'type': 'whale', 'ticker': 'WHL', 'company_name': 'Whl Inc', 'insider_name': 'Wh Ale',
+             'title': 'CEO, 10%', 'purchase_value_usd': 150000000, 'purchase_value_millions': 150.0,
+             'purchase_price': 50.0, 'purchase_date': days_ago(1), 'days_since_trade': 1,
+             'freshness': 'fresh', 'confidence': 'high', 'whale_score': 100, 'qty_purchased': 3000000},
+            {'type': 'whale', 'ticker': 'WH2', 'company_name': 'Wh2 Inc', 'insider_name': 'Big Fund',
+             'title': '10%', 'purchase_value_usd': 120000000, 'purchase_value_millions': 120.0,
+             'purchase_price': 60.0, 'purchase_date': days_ago(10), 'days_since_trade': 10,
+             'freshness': 'recent', 'confidence': 'high', 'whale_score': 85, 'qty_purchased': 2000000},
+        ])
+
+    def test_sales(self):
+        sales = self.scraper.detect_insider_sales(self.df, self.masks)
+        self.assertEqual(sales, [
+            {'ticker': 'SSS', 'company_name': 'Sss Inc', 'insider_name': 'Sue Ceo', 'title': 'CEO',
+             'sale_date': days_ago(3), 'sale_price': 20.0, 'qty_sold': 10000, 'sale_value_usd': 200000,
+             'sale_value_millions': 0.2, 'days_since_sale': 3, 'shares_remaining': 0},
+            {'ticker': 'CCC', 'company_name': 'Ccc Inc', 'insider_name': 'Cy Cfo', 'title': 'CFO',
+             'sale_date': days_ago(6), 'sale_price': 30.0, 'qty_sold': 5000, 'sale_value_usd': 150000,
+             'sale_value_millions': 0.1, 'days_since_sale': 6, 'shares_remaining': 0},  # round(0.15, 1)
+        ])
+
+    def test_cached_page_skips_network(self):
+        self.get.reset_mock()
+        df = self.scraper.scrape_recent_insider_data()  # misma URL que en setUp, dentro del TTL
+        self.get.assert_not_called()
+        self.assertEqual(len(df), len(self.df))
+
+    def test_expired_page_is_fetched_again(self):
+        self.get.reset_mock()
+        self.scraper.ttl_html = 0
+        self.scraper.scrape_recent_insider_data()
+        self.get.assert_called_once()
+
+    def test_page_without_table_is_not_cached(self):
+        self.get.return_value = mock.Mock(text='<html><body>Mantenimiento</body></html>')
+        url = 'http://openinsider.com/screener?page=99'
+        self.assertIsNone(self.scraper._fetch_raw_table(url))
+        self.assertIsNone(self.scraper.cache.get('openinsider', url, self.scraper.ttl_html))
+        # La siguiente ejecución vuelve a OpenInsider en vez de servir la página de error
+        self.get.return_value = mock.Mock(text=page(ROWS))
+        self.assertEqual(len(self.scraper._fetch_raw_table(url)), len(ROWS) - 1)
+        self.assertEqual(self.get.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()